@@ -4,23 +4,56 @@ Universal Rate Limit Tester
 Tests API rate limits for each proxy and manages proxy status automatically.
 """
 
-import json
+import heapq
 import logging
+import queue
+import re
+import shutil
+import threading
 import time
+from bisect import bisect_right
+from collections import Counter
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# protocol:host:port:username:password:status:interval_ms (password may contain ':')
+_PROXY_RE = re.compile(r'^([^:]+):([^:]+):(\d+):([^:]*):(.*):([^:]+):(\d+)$')
+
+_UTF8_BOM = b'\xef\xbb\xbf'
+
+# Proxy workers only block on sockets, so the default 8 MB thread stack is wasted
+_WORKER_STACK_SIZE = 512 * 1024
+
+# Default number of threads sending scheduled requests (config key "max_workers")
+_DEFAULT_MAX_WORKERS = 32
+
+# Dispatching a proxy later than this fraction of its interval means the pool is too small
+_LAG_WARN_FRACTION = 0.25
+# Minimum seconds between "falling behind" warnings
+_LAG_WARN_EVERY_S = 10.0
+
+# How long the background saver waits for more disables before writing the config
+_SAVE_DEBOUNCE_S = 0.5
 
-@dataclass
+# _format_time picks a formatter by bisecting the unit thresholds (1s, 1m, 1h)
+_TIME_THRESHOLDS = (1000, 60000, 3600000)
+_TIME_FORMATTERS = (
+    lambda ms: f"{ms}ms",
+    lambda ms: f"{ms / 1000:.2f}s",
+    lambda ms: "{}m {:.2f}s".format(ms // 60000, ms % 60000 / 1000),
+    lambda ms: f"{ms / 3600000:.2f}h",
+)
+
+
+@dataclass(slots=True, frozen=False)
 class ProxyConfig:
     protocol: str
     host: str
@@ -29,6 +62,18 @@ class ProxyConfig:
     password: str
     status: str
     interval_ms: int
+    # Derived once per proxy so the test loop never rebuilds them
+    _url: str = field(init=False, repr=False, compare=False)
+    _proxies_dict: Dict[str, str] = field(init=False, repr=False, compare=False)
+    _interval_s: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.username and self.password:
+            self._url = f"{self.protocol}://{self.username}:{self.password}@{self.host}:{self.port}"
+        else:
+            self._url = f"{self.protocol}://{self.host}:{self.port}"
+        self._proxies_dict = {'http': self._url, 'https': self._url}
+        self._interval_s = self.interval_ms / 1000.0
 
     def to_string(self) -> str:
         """Convert back to config string format."""
@@ -36,9 +81,26 @@ class ProxyConfig:
 
     def get_proxy_url(self) -> str:
         """Get formatted proxy URL for requests."""
-        if self.username and self.password:
-            return f"{self.protocol}://{self.username}:{self.password}@{self.host}:{self.port}"
-        return f"{self.protocol}://{self.host}:{self.port}"
+        return self._url
+
+
+@dataclass(slots=True)
+class ProxyRun:
+    """Test state of one proxy, carried between its scheduled requests."""
+    proxy: ProxyConfig
+    session: requests.Session
+    start_time: float
+    next_request: float
+    # When the run was last handed back to the scheduler, or next_request if that was later
+    ready_at: float
+    success_count: int = 0
+    fail_count: int = 0
+    consecutive_fails: int = 0
+    request_num: int = 0
+    # ETag of the last validated body; lets the server answer 304 instead of resending it
+    conditional_headers: Optional[Dict[str, str]] = None
+    # Final result, set once the proxy is disabled or errors out
+    result: Optional[Dict[str, Any]] = None
 
 
 class RateLimitTester:
@@ -48,48 +110,166 @@ class RateLimitTester:
         self.config_path = Path(config_path)
         self.config = self._load_config()
         self.proxies = self._parse_proxies()
-        self.session = requests.Session()
-        self.start_time = time.time()
+        self.start_time_mono = time.monotonic()
+
+        # Disables are appended to a write-ahead log and rolled into the config once per run
+        self._save_lock = threading.Lock()
+        self._updates_path = Path(f"{self.config_path}.updates")
+        self._replay_updates()
+        # Disables only signal the background saver, which coalesces bursts into one write
+        self._save_pending = threading.Event()
+        self._saver_stop = threading.Event()
+
+        # Min-heap of (next_request, seq, run) shared by the scheduler and request workers
+        self._schedule: List[tuple] = []
+        self._schedule_cond = threading.Condition()
+        self._active_runs = 0
+        self._late_dispatches = 0
+        self._last_lag_warning = float('-inf')
+        self._max_workers = 0
+        self._busy_workers = 0
+
+        # Config is immutable during a run, so resolve hot-path lookups once
+        self._req_params = self._build_request_params()
+        self._validation = self.config['api']['validation']
+        cf_indicators = self._validation.get('cloudflare_indicators', [])
+        rl_indicators = self._validation.get('ratelimit_indicators', [])
+        self._cf_patterns = self._compile_indicators(cf_indicators)
+        self._rl_patterns = self._compile_indicators(rl_indicators)
+        # Bodies shorter than the shortest indicator cannot match any of them
+        # (character count is a lower bound on encoded size, so this holds for non-ASCII indicators too)
+        self._min_indicator_len = min((len(i) for i in cf_indicators + rl_indicators), default=0)
+        self._success_field = self._validation.get('success_field')
+        self._success_value = self._validation.get('success_value')
+        # Compiled up front so a bad pattern fails at startup instead of on every response
+        regex_pattern = self._validation.get('response_regex')
+        self._response_regex = re.compile(regex_pattern) if regex_pattern else None
+
+    def _create_session(self, headers: Dict[str, str], pool_size: int = 4) -> requests.Session:
+        """Create a per-proxy HTTP session with its own connection pool."""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            pool_block=False,
+            max_retries=0
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        # Set headers once so each request skips merging them
+        session.headers.update(headers)
+        return session
+
+    @staticmethod
+    def _compile_indicators(indicators: List[str]) -> tuple[Optional[re.Pattern], Optional[re.Pattern]]:
+        """
+        Compile indicator strings into case-insensitive patterns.
+        Returns (bytes_pattern, text_pattern): ASCII indicators are matched on raw bytes,
+        non-ASCII ones on decoded text because IGNORECASE only folds ASCII for bytes.
+        """
+        ascii_indicators = [i for i in indicators if i.isascii()]
+        other_indicators = [i for i in indicators if not i.isascii()]
+        bytes_pattern = None
+        text_pattern = None
+        if ascii_indicators:
+            bytes_pattern = re.compile(b'|'.join(re.escape(i.encode()) for i in ascii_indicators), re.IGNORECASE)
+        if other_indicators:
+            text_pattern = re.compile('|'.join(re.escape(i) for i in other_indicators), re.IGNORECASE)
+        return bytes_pattern, text_pattern
+
+    @staticmethod
+    def _search_indicators(patterns: tuple[Optional[re.Pattern], Optional[re.Pattern]], response: requests.Response) -> bool:
+        """Check whether any indicator compiled by _compile_indicators occurs in the response body."""
+        bytes_pattern, text_pattern = patterns
+        if bytes_pattern and bytes_pattern.search(response.content):
+            return True
+        return bool(text_pattern and text_pattern.search(response.text))
 
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from JSON file."""
-        with open(self.config_path, 'r') as f:
-            return json.load(f)
+        return orjson.loads(self.config_path.read_bytes())
 
     def _parse_proxies(self) -> List[ProxyConfig]:
         """Parse proxy strings into ProxyConfig objects."""
         proxies = []
-        for proxy_str in self.config.get('proxies', []):
-            parts = proxy_str.split(':')
-            if len(parts) >= 7:
-                proxies.append(ProxyConfig(
-                    protocol=parts[0],
-                    host=parts[1],
-                    port=parts[2],
-                    username=parts[3],
-                    password=parts[4],
-                    status=parts[5],
-                    interval_ms=int(parts[6])
-                ))
+        for index, proxy_str in enumerate(self.config.get('proxies', [])):
+            m = _PROXY_RE.match(proxy_str)
+            if not m:
+                # Log the position only: the entry may contain credentials
+                logger.warning(f"Skipping malformed proxy entry at proxies[{index}]")
+                continue
+            protocol, host, port, username, password, status, interval_ms = m.groups()
+            proxies.append(ProxyConfig(
+                protocol=protocol,
+                host=host,
+                port=port,
+                username=username,
+                password=password,
+                status=status,
+                interval_ms=int(interval_ms)
+            ))
         return proxies
 
     def _save_config(self) -> None:
         """Save updated proxy configurations back to config file."""
-        # Update proxies in config
-        self.config['proxies'] = [p.to_string() for p in self.proxies]
+        with self._save_lock:
+            # Update proxies in config
+            self.config['proxies'] = [p.to_string() for p in self.proxies]
+
+            # Create backup
+            backup_path = f"{self.config_path}.backup"
+            if self.config_path.exists():
+                shutil.copy2(self.config_path, backup_path)
 
-        # Create backup
-        backup_path = f"{self.config_path}.backup"
-        if self.config_path.exists():
-            import shutil
-            shutil.copy2(self.config_path, backup_path)
+            # Save updated config
+            self.config_path.write_bytes(orjson.dumps(self.config, option=orjson.OPT_INDENT_2))
 
-        # Save updated config
-        with open(self.config_path, 'w') as f:
-            json.dump(self.config, f, indent=2)
+            # Updates log is now part of the config
+            self._updates_path.unlink(missing_ok=True)
 
         logger.info(f"Config saved. Backup created at {backup_path}")
 
+    def _append_update(self, record: Dict[str, Any]) -> None:
+        """Append a single proxy update to the write-ahead log. Caller must hold _save_lock."""
+        with open(self._updates_path, 'ab') as f:
+            f.write(orjson.dumps(record) + b"\n")
+
+    def _replay_updates(self) -> None:
+        """Apply updates left over from an interrupted run and roll them into the config."""
+        if not self._updates_path.exists():
+            return
+
+        for line in self._updates_path.read_bytes().splitlines():
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # Last line may be truncated if the run was killed mid-write
+                continue
+
+            for proxy in self.proxies:
+                if (proxy.host, proxy.port, proxy.interval_ms) == (record['host'], record['port'], record['interval_ms']):
+                    proxy.status = record['status']
+
+            if 'lifetime' in record:
+                self.config.setdefault('lifetimes', {})[f"{record['host']}:{record['port']}"] = record['lifetime']
+
+        logger.info(f"Replayed pending proxy updates from {self._updates_path}")
+        self._save_config()
+
+    def _flush_updates(self) -> None:
+        """Roll pending updates into the config file, if there are any."""
+        if self._updates_path.exists():
+            self._save_config()
+
+    def _save_worker(self) -> None:
+        """Background thread: save the config once per burst of proxy disables."""
+        while not self._saver_stop.is_set():
+            self._save_pending.wait()
+            # Let concurrent disables pile up, unless the run is ending
+            self._saver_stop.wait(_SAVE_DEBOUNCE_S)
+            self._save_pending.clear()
+            self._flush_updates()
+
     def _build_request_params(self) -> Dict[str, Any]:
         """Build request parameters from config."""
         api_config = self.config['api']
@@ -117,7 +297,12 @@ class RateLimitTester:
         Check if response is valid according to validation rules.
         Returns (is_valid, reason)
         """
-        validation = self.config['api']['validation']
+        validation = self._validation
+
+        # Conditional GET matched the last validated body: nothing to re-check.
+        # An unsolicited 304 falls through to the generic HTTP error below.
+        if response.status_code == 304 and response.request.headers.get('If-None-Match'):
+            return True, "not_modified"
 
         # Check status code
         if response.status_code != 200:
@@ -125,21 +310,34 @@ class RateLimitTester:
                 return False, "ratelimit_error"
             return False, f"http_error_{response.status_code}"
 
-        # Check for Cloudflare
-        response_text = response.text.lower()
-        for indicator in validation.get('cloudflare_indicators', []):
-            if indicator.lower() in response_text:
-                return False, "cloudflare_block"
+        # Parse the body once; Cloudflare indicators only target non-JSON pages
+        body = response.content
+        is_json, data = self._parse_json(response)
+        if not is_json:
+            # Scan raw bytes once per indicator group instead of decoding and lowercasing the body
+            if len(body) >= self._min_indicator_len:
+                # Check for Cloudflare
+                if self._search_indicators(self._cf_patterns, response):
+                    return False, "cloudflare_block"
+
+                # Check for rate limit indicators in response
+                if self._search_indicators(self._rl_patterns, response):
+                    return False, "ratelimit_error"
 
-        # Check for rate limit indicators in response
-        for indicator in validation.get('ratelimit_indicators', []):
-            if indicator.lower() in response_text:
+            # If response is not JSON but validation expects it
+            if validation.get('response_type'):
+                return False, "invalid_json"
+            return True, "ok"
+
+        # JSON APIs may report a rate limit in the body (e.g. {"error": "Too Many Requests"});
+        # unless the success field is there to decide, scan for rate limit indicators
+        has_success_field = bool(self._success_field) and isinstance(data, dict) and self._success_field in data
+        if not has_success_field and len(body) >= self._min_indicator_len:
+            if self._search_indicators(self._rl_patterns, response):
                 return False, "ratelimit_error"
 
         # Check JSON response structure and content
         try:
-            data = response.json()
-
             # Check if response should be an array
             if validation.get('response_type') == 'array':
                 if not isinstance(data, list):
@@ -155,64 +353,61 @@ class RateLimitTester:
                     return False, "invalid_response_type_expected_object"
 
             # Check regex pattern if specified
-            regex_pattern = validation.get('response_regex')
-            if regex_pattern:
-                import re
-                if not re.search(regex_pattern, response.text):
+            if self._response_regex:
+                if not self._response_regex.search(response.text):
                     return False, "regex_pattern_not_matched"
 
             # Check success field in JSON response (legacy support)
-            success_field = validation.get('success_field')
-            success_value = validation.get('success_value')
-
+            success_field = self._success_field
             if success_field and success_field in data:
-                if data[success_field] != success_value:
+                if data[success_field] != self._success_value:
                     return False, "api_success_false"
 
             # Check required fields if specified
             required_fields = validation.get('required_fields', [])
             if isinstance(data, dict):
-                for field in required_fields:
-                    if field not in data:
-                        return False, f"missing_field_{field}"
+                for required in required_fields:
+                    if required not in data:
+                        return False, f"missing_field_{required}"
             elif isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict):
                 # Check required fields in first array element
-                for field in required_fields:
-                    if field not in data[0]:
-                        return False, f"missing_field_{field}"
+                for required in required_fields:
+                    if required not in data[0]:
+                        return False, f"missing_field_{required}"
 
-        except json.JSONDecodeError:
-            # If response is not JSON but validation expects it
-            if validation.get('response_type'):
-                return False, "invalid_json"
-            pass
-        except Exception as e:
+        except TypeError as e:
+            # JSON shape doesn't support the configured checks (e.g. field lookup on a scalar)
             logger.debug(f"Validation error: {e}")
-            pass
 
         return True, "ok"
 
+    def _parse_json(self, response: requests.Response) -> tuple[bool, Any]:
+        """
+        Parse the response body as JSON.
+        Returns (is_json, data)
+        """
+        body = response.content
+        try:
+            return True, orjson.loads(body[len(_UTF8_BOM):] if body.startswith(_UTF8_BOM) else body)
+        except orjson.JSONDecodeError:
+            pass
+
+        # Fall back for bodies orjson rejects but the stdlib accepts (NaN/Infinity, non-UTF-8 encodings)
+        try:
+            return True, response.json()
+        except ValueError:
+            return False, None
+
     def _format_time(self, ms: int) -> str:
         """Format milliseconds to human-readable format."""
-        if ms < 1000:
-            return f"{ms}ms"
-        elif ms < 60000:
-            seconds = ms / 1000
-            return f"{seconds:.2f}s"
-        elif ms < 3600000:
-            minutes = ms / 60000
-            seconds = (ms % 60000) / 1000
-            return f"{int(minutes)}m {seconds:.2f}s"
-        else:
-            hours = ms / 3600000
-            minutes = (ms % 3600000) / 60000
-            return f"{hours:.2f}h"
+        return _TIME_FORMATTERS[bisect_right(_TIME_THRESHOLDS, ms)](ms)
 
-    def _disable_proxy(self, proxy: ProxyConfig, reason: str, success_count: int = 0, fail_count: int = 0) -> None:
+    def _disable_proxy(self, proxy: ProxyConfig, reason: str, success_count: int = 0, fail_count: int = 0,
+                       achieved_interval_ms: Optional[int] = None) -> None:
         """Disable a proxy in the config."""
         proxy.status = "disabled"
         # Calculate lifetime in milliseconds from start
-        lifetime_ms = int((time.time() - self.start_time) * 1000)
+        lifetime_ms = int((time.monotonic() - self.start_time_mono) * 1000)
 
         # Calculate error percentage
         total_requests = success_count + fail_count
@@ -220,21 +415,29 @@ class RateLimitTester:
 
         # Save lifetime to config with detailed info
         proxy_key = f"{proxy.host}:{proxy.port}"
-        if 'lifetimes' not in self.config:
-            self.config['lifetimes'] = {}
-
-        self.config['lifetimes'][proxy_key] = {
+        lifetime = {
             "ip": proxy_key,
             "interval": proxy.interval_ms,
+            "achieved_interval": achieved_interval_ms,
             "lifetime": lifetime_ms,
             "lifetime_readable": self._format_time(lifetime_ms),
             "errors": fail_count,
             "errors_percents": round(error_percentage, 2)
         }
 
+        with self._save_lock:
+            self.config.setdefault('lifetimes', {})[proxy_key] = lifetime
+            self._append_update({
+                "host": proxy.host,
+                "port": proxy.port,
+                "status": proxy.status,
+                "interval_ms": proxy.interval_ms,
+                "lifetime": lifetime
+            })
+
         formatted_time = self._format_time(lifetime_ms)
         logger.warning(f"🔴 DISABLED proxy {proxy.host}:{proxy.port} | Reason: {reason} | Lifetime: {formatted_time} | Errors: {fail_count}/{total_requests} ({error_percentage:.1f}%)")
-        self._save_config()
+        self._save_pending.set()
 
     def _should_disable_proxy(self, success_count: int, fail_count: int, consecutive_fails: int) -> tuple[bool, str]:
         """
@@ -258,6 +461,123 @@ class RateLimitTester:
 
         return False, ''
 
+    def _start_run(self, proxy: ProxyConfig) -> ProxyRun:
+        """Create the test state for an enabled proxy."""
+        formatted_interval = self._format_time(proxy.interval_ms)
+        logger.info(f"🔄 Starting infinite test | Proxy: {proxy.host}:{proxy.port} | Interval: {formatted_interval}")
+
+        now = time.monotonic()
+        return ProxyRun(
+            proxy=proxy,
+            # Each proxy owns its session so keep-alive sockets are never shared between proxies
+            session=self._create_session(self._req_params['headers']),
+            start_time=now,
+            next_request=now,
+            ready_at=now
+        )
+
+    def _achieved_interval_ms(self, run: ProxyRun) -> Optional[int]:
+        """Average start-to-start interval actually achieved by a run, or None before its second request."""
+        if run.request_num < 2:
+            return None
+        last_request_start = run.next_request - run.proxy._interval_s
+        return int((last_request_start - run.start_time) / (run.request_num - 1) * 1000)
+
+    def _run_result(self, run: ProxyRun, status: str, elapsed_seconds: float, **details: Any) -> Dict[str, Any]:
+        """Build the result entry for a finished proxy run."""
+        return {
+            'proxy': f"{run.proxy.host}:{run.proxy.port}",
+            'status': status,
+            **details,
+            'requests_tested': run.request_num,
+            'success_count': run.success_count,
+            'fail_count': run.fail_count,
+            'elapsed_seconds': elapsed_seconds,
+            'interval_ms': run.proxy.interval_ms,
+            'achieved_interval_ms': self._achieved_interval_ms(run)
+        }
+
+    def _test_one_request(self, run: ProxyRun) -> Optional[Dict[str, Any]]:
+        """
+        Send a single request through a proxy and update its counters.
+        Returns test results if the proxy got disabled, otherwise None.
+        """
+        proxy = run.proxy
+        req_params = self._req_params
+
+        run.request_num += 1
+        # Monotonic clock: immune to wall-clock jumps, read once per phase and reused
+        request_start = time.monotonic()
+        # Pace from request start so slow responses don't stretch the interval
+        run.next_request = request_start + proxy._interval_s
+
+        try:
+            if req_params['method'] == 'GET':
+                response = run.session.get(
+                    req_params['url'],
+                    params=req_params['params'],
+                    headers=run.conditional_headers,
+                    proxies=proxy._proxies_dict,
+                    timeout=req_params['timeout']
+                )
+            else:
+                response = run.session.post(
+                    req_params['url'],
+                    json=req_params.get('params'),
+                    proxies=proxy._proxies_dict,
+                    timeout=req_params['timeout']
+                )
+            finished = time.monotonic()
+            request_duration_ms = int((finished - request_start) * 1000)
+
+            is_valid, reason = self._check_response(response)
+
+            if is_valid:
+                etag = response.headers.get('ETag')
+                if etag:
+                    run.conditional_headers = {'If-None-Match': etag}
+                run.success_count += 1
+                run.consecutive_fails = 0  # Reset consecutive counter on success
+                # Skip formatting entirely when INFO is filtered out
+                if logger.isEnabledFor(logging.INFO):
+                    elapsed_time = self._format_time(int((finished - run.start_time) * 1000))
+                    logger.info(
+                        "✅ Request #%d OK | Success: %d, Fail: %d | Proxy: %s:%s | Interval: %d | Runtime: %s | Duration: %dms",
+                        run.request_num, run.success_count, run.fail_count, proxy.host, proxy.port, proxy.interval_ms, elapsed_time, request_duration_ms
+                    )
+            else:
+                run.fail_count += 1
+                run.consecutive_fails += 1
+                logger.error(
+                    "❌ Request #%d FAILED | Reason: %s | Consecutive fails: %d | Proxy: %s:%s",
+                    run.request_num, reason, run.consecutive_fails, proxy.host, proxy.port
+                )
+
+                # Check if proxy should be disabled based on policy
+                should_disable, disable_reason = self._should_disable_proxy(run.success_count, run.fail_count, run.consecutive_fails)
+                if should_disable:
+                    self._disable_proxy(proxy, f"{reason}_{disable_reason}", run.success_count, run.fail_count,
+                                        self._achieved_interval_ms(run))
+                    return self._run_result(run, 'disabled', finished - run.start_time, reason=disable_reason)
+
+        except Exception as e:
+            finished = time.monotonic()
+            run.fail_count += 1
+            run.consecutive_fails += 1
+            logger.error(
+                "❌ Request #%d EXCEPTION | Error: %.100s | Consecutive fails: %d | Proxy: %s:%s",
+                run.request_num, e, run.consecutive_fails, proxy.host, proxy.port
+            )
+
+            # Check if proxy should be disabled based on policy
+            should_disable, disable_reason = self._should_disable_proxy(run.success_count, run.fail_count, run.consecutive_fails)
+            if should_disable:
+                self._disable_proxy(proxy, f"exception_{disable_reason}", run.success_count, run.fail_count,
+                                    self._achieved_interval_ms(run))
+                return self._run_result(run, 'disabled', finished - run.start_time, reason=disable_reason, error=str(e))
+
+        return None
+
     def test_proxy(self, proxy: ProxyConfig) -> Dict[str, Any]:
         """
         Test a single proxy with the configured API in infinite loop.
@@ -270,111 +590,95 @@ class RateLimitTester:
                 'reason': f'proxy is {proxy.status}'
             }
 
-        formatted_interval = self._format_time(proxy.interval_ms)
-        logger.info(f"🔄 Starting infinite test | Proxy: {proxy.host}:{proxy.port} | Interval: {formatted_interval}")
-
-        # Build request params
-        req_params = self._build_request_params()
-
-        # Setup proxy
-        proxy_url = proxy.get_proxy_url()
-        proxies = {
-            'http': proxy_url,
-            'https': proxy_url
-        }
-
-        success_count = 0
-        fail_count = 0
-        consecutive_fails = 0
-        start_time = time.time()
-        request_num = 0
+        run = self._start_run(proxy)
 
         # Test in infinite loop until disable policy triggers
         try:
             while True:
-                request_num += 1
+                result = self._test_one_request(run)
+                if result:
+                    return result
 
-                try:
-                    request_start = time.time()
-                    if req_params['method'] == 'GET':
-                        response = self.session.get(
-                            req_params['url'],
-                            params=req_params['params'],
-                            headers=req_params['headers'],
-                            proxies=proxies,
-                            timeout=req_params['timeout']
-                        )
-                    else:
-                        response = self.session.post(
-                            req_params['url'],
-                            json=req_params.get('params'),
-                            headers=req_params['headers'],
-                            proxies=proxies,
-                            timeout=req_params['timeout']
-                        )
-                    request_duration_ms = int((time.time() - request_start) * 1000)
-
-                    is_valid, reason = self._check_response(response)
-
-                    if is_valid:
-                        success_count += 1
-                        consecutive_fails = 0  # Reset consecutive counter on success
-                        elapsed_time = self._format_time(int((time.time() - start_time) * 1000))
-                        logger.info(f"✅ Request #{request_num} OK | Success: {success_count}, Fail: {fail_count} | Proxy: {proxy.host}:{proxy.port} | Interval: {proxy.interval_ms} | Runtime: {elapsed_time} | Duration: {request_duration_ms}ms")
-                    else:
-                        fail_count += 1
-                        consecutive_fails += 1
-                        logger.error(f"❌ Request #{request_num} FAILED | Reason: {reason} | Consecutive fails: {consecutive_fails} | Proxy: {proxy.host}:{proxy.port}")
-
-                        # Check if proxy should be disabled based on policy
-                        should_disable, disable_reason = self._should_disable_proxy(success_count, fail_count, consecutive_fails)
-                        if should_disable:
-                            self._disable_proxy(proxy, f"{reason}_{disable_reason}", success_count, fail_count)
-                            return {
-                                'proxy': f"{proxy.host}:{proxy.port}",
-                                'status': 'disabled',
-                                'reason': disable_reason,
-                                'requests_tested': request_num,
-                                'success_count': success_count,
-                                'fail_count': fail_count,
-                                'elapsed_seconds': time.time() - start_time
-                            }
-
-                except Exception as e:
-                    fail_count += 1
-                    consecutive_fails += 1
-                    error_msg = str(e)
-                    logger.error(f"❌ Request #{request_num} EXCEPTION | Error: {error_msg[:100]} | Consecutive fails: {consecutive_fails} | Proxy: {proxy.host}:{proxy.port}")
-
-                    # Check if proxy should be disabled based on policy
-                    should_disable, disable_reason = self._should_disable_proxy(success_count, fail_count, consecutive_fails)
-                    if should_disable:
-                        self._disable_proxy(proxy, f"exception_{disable_reason}", success_count, fail_count)
-                        return {
-                            'proxy': f"{proxy.host}:{proxy.port}",
-                            'status': 'disabled',
-                            'reason': disable_reason,
-                            'error': error_msg,
-                            'requests_tested': request_num,
-                            'success_count': success_count,
-                            'fail_count': fail_count,
-                            'elapsed_seconds': time.time() - start_time
-                        }
-
-                # Wait for the interval
-                time.sleep(proxy.interval_ms / 1000.0)
+                # Wait out the rest of the interval
+                time.sleep(max(0.0, run.next_request - time.monotonic()))
 
         except KeyboardInterrupt:
             logger.info(f"⏹️  Test interrupted for proxy {proxy.host}:{proxy.port}")
-            return {
+            return self._run_result(run, 'interrupted', time.monotonic() - run.start_time)
+        finally:
+            run.session.close()
+            # Roll this proxy's disable into the config; no background saver runs outside test_all_proxies
+            self._flush_updates()
+
+    def _run_scheduled(self, run: ProxyRun, seq: int) -> None:
+        """Worker task: send one request for a proxy, then hand the proxy back to the scheduler."""
+        proxy = run.proxy
+        try:
+            result = self._test_one_request(run)
+        except Exception as e:
+            logger.error(f"Error testing proxy {proxy.host}:{proxy.port}: {e}")
+            result = {
                 'proxy': f"{proxy.host}:{proxy.port}",
-                'status': 'interrupted',
-                'requests_tested': request_num,
-                'success_count': success_count,
-                'fail_count': fail_count,
-                'elapsed_seconds': time.time() - start_time
+                'status': 'error',
+                'error': str(e)
             }
 
+        if result and result['status'] == 'disabled':
+            logger.warning(f"⚠️  Proxy {proxy.host}:{proxy.port} was disabled after {result['requests_tested']} requests")
+
+        with self._schedule_cond:
+            self._busy_workers -= 1
+            if result:
+                run.result = result
+                self._active_runs -= 1
+            else:
+                # A request slower than its interval comes back already due; that lateness is the
+                # proxy's own, so only time spent waiting from here on counts against the pool
+                run.ready_at = max(run.next_request, time.monotonic())
+                heapq.heappush(self._schedule, (run.next_request, seq, run))
+            self._schedule_cond.notify()
+
+    def _dispatch_scheduled(self, executor: ThreadPoolExecutor) -> None:
+        """Submit each proxy's next request when it falls due, until every run has finished."""
+        with self._schedule_cond:
+            while self._active_runs:
+                if not self._schedule:
+                    # Every remaining proxy has a request in flight
+                    self._schedule_cond.wait()
+                    continue
+
+                now = time.monotonic()
+                delay = self._schedule[0][0] - now
+                if delay > 0:
+                    # Woken early if a finished request reschedules an earlier proxy
+                    self._schedule_cond.wait(delay)
+                    continue
+
+                if self._busy_workers >= self._max_workers:
+                    # Only submit when a worker is free, so due proxies wait here where the delay is visible
+                    self._schedule_cond.wait()
+                    continue
+
+                _, seq, run = heapq.heappop(self._schedule)
+                pool_lag = now - run.ready_at
+                if pool_lag > run.proxy._interval_s * _LAG_WARN_FRACTION:
+                    self._warn_late_dispatch(run, pool_lag, now)
+                self._busy_workers += 1
+                executor.submit(self._run_scheduled, run, seq)
+
+    def _warn_late_dispatch(self, run: ProxyRun, lag_s: float, now: float) -> None:
+        """Report (rate-limited) that due proxies are waiting on a saturated worker pool."""
+        self._late_dispatches += 1
+        if now - self._last_lag_warning < _LAG_WARN_EVERY_S:
+            return
+        logger.warning(
+            f"🐢 Falling behind schedule: {self._late_dispatches} late requests, e.g. proxy {run.proxy.host}:{run.proxy.port} "
+            f"waited {int(lag_s * 1000)}ms for a free worker (interval {run.proxy.interval_ms}ms). "
+            f"Achieved rates are below interval_ms; raise max_workers (currently {self._max_workers})"
+        )
+        self._late_dispatches = 0
+        self._last_lag_warning = now
+
     def test_all_proxies(self) -> List[Dict[str, Any]]:
         """Test all enabled proxies in parallel."""
         results = []
@@ -383,59 +687,108 @@ class RateLimitTester:
         logger.info(f"Starting parallel rate limit test for {len(enabled_proxies)} enabled proxies")
         logger.info(f"Total proxies: {len(self.proxies)}")
 
-        # Test all proxies in parallel
-        with ThreadPoolExecutor(max_workers=len(enabled_proxies)) as executor:
-            # Submit all proxy tests
-            future_to_proxy = {
-                executor.submit(self.test_proxy, proxy): proxy
-                for proxy in self.proxies
-            }
-
-            # Collect results as they complete
-            for future in as_completed(future_to_proxy):
-                proxy = future_to_proxy[future]
+        # Non-enabled proxies are reported directly instead of being scheduled
+        for proxy in self.proxies:
+            if proxy.status != "enabled":
+                results.append(self.test_proxy(proxy))
+
+        # One scheduler (this thread) paces every proxy; a small pool only sends requests that are due
+        runs = [self._start_run(proxy) for proxy in enabled_proxies]
+        with self._schedule_cond:
+            self._schedule = [(run.next_request, seq, run) for seq, run in enumerate(runs)]
+            heapq.heapify(self._schedule)
+            self._active_runs = len(runs)
+
+        self._saver_stop.clear()
+        saver = threading.Thread(target=self._save_worker, name='rl-save', daemon=True)
+        saver.start()
+
+        self._max_workers = max(min(len(runs), self.config.get('max_workers', _DEFAULT_MAX_WORKERS)), 1)
+        self._busy_workers = 0
+        # Pool threads are spawned lazily on submit, so keep the small stack size for the whole run
+        previous_stack_size = threading.stack_size(_WORKER_STACK_SIZE)
+        try:
+            with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='rl') as executor:
                 try:
-                    result = future.result()
-                    results.append(result)
-
-                    if result['status'] == 'disabled':
-                        logger.warning(f"⚠️  Proxy {proxy.host}:{proxy.port} was disabled after {result['requests_tested']} requests")
-                except Exception as e:
-                    logger.error(f"Error testing proxy {proxy.host}:{proxy.port}: {e}")
-                    results.append({
-                        'proxy': f"{proxy.host}:{proxy.port}",
-                        'status': 'error',
-                        'error': str(e)
-                    })
+                    self._dispatch_scheduled(executor)
+                except KeyboardInterrupt:
+                    logger.info("⏹️  Test interrupted, waiting for in-flight requests")
+                    # Don't start anything still queued after the user asked to stop
+                    executor.shutdown(wait=True, cancel_futures=True)
+        finally:
+            threading.stack_size(previous_stack_size)
+            for run in runs:
+                run.session.close()
+            # Stop the saver so it can't be killed mid-write at exit, then roll in anything left
+            self._saver_stop.set()
+            self._save_pending.set()
+            saver.join()
+            self._flush_updates()
+
+        for run in runs:
+            if run.result is None:
+                run.result = self._run_result(run, 'interrupted', time.monotonic() - run.start_time)
+            results.append(run.result)
 
         # Print summary
         logger.info("\n" + "="*50)
         logger.info("RATE LIMIT TEST SUMMARY")
         logger.info("="*50)
 
-        interrupted = sum(1 for r in results if r['status'] == 'interrupted')
-        disabled = sum(1 for r in results if r['status'] == 'disabled')
-        skipped = sum(1 for r in results if r['status'] == 'skipped')
-        errors = sum(1 for r in results if r['status'] == 'error')
+        # Count every status in a single pass over the results
+        status_counts = Counter(r['status'] for r in results)
 
-        logger.info(f"⏹️  Interrupted proxies: {interrupted}")
-        logger.info(f"🔴 Disabled proxies: {disabled}")
-        logger.info(f"⏭️  Skipped proxies: {skipped}")
-        logger.info(f"❌ Error proxies: {errors}")
+        logger.info(f"⏹️  Interrupted proxies: {status_counts['interrupted']}")
+        logger.info(f"🔴 Disabled proxies: {status_counts['disabled']}")
+        logger.info(f"⏭️  Skipped proxies: {status_counts['skipped']}")
+        logger.info(f"❌ Error proxies: {status_counts['error']}")
 
         return results
 
 
+def _setup_logging() -> Optional[QueueListener]:
+    """
+    Configure console logging through a queue, unless the root logger is already configured.
+    Returns the started listener, or None if logging was left untouched.
+    """
+    root_logger = logging.getLogger()
+    # Same rule as basicConfig: never override logging an embedding program already set up
+    if root_logger.handlers:
+        return None
+
+    # Worker threads still merge log messages with their args, but only enqueue the records;
+    # a single listener thread does the stream I/O, so workers never block on terminal writes
+    log_queue = queue.SimpleQueue()
+    log_handler = logging.StreamHandler()
+    log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    listener = QueueListener(log_queue, log_handler)
+
+    # Attached directly: basicConfig would give the queue handler BASIC_FORMAT and prefix every line twice
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+
 def main():
     """Main entry point."""
     import sys
 
     config_path = sys.argv[1] if len(sys.argv) > 1 else "config.json"
 
-    tester = RateLimitTester(config_path)
-    results = tester.test_all_proxies()
+    log_listener = _setup_logging()
+    try:
+        tester = RateLimitTester(config_path)
+        results = tester.test_all_proxies()
+
+        results_path = Path("test_results.json")
+        results_path.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
 
-    logger.info("\nTesting completed. All results are saved in config.json")
+        logger.info(f"\nTesting completed. Results saved in {results_path}, proxy status saved in {config_path}")
+    finally:
+        # Flush queued records before exiting
+        if log_listener:
+            log_listener.stop()
 
 
 if __name__ == "__main__":